@@ -0,0 +1,810 @@
+import sqlite3
+import contextlib
+import functools
+import gzip
+import inspect
+import itertools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import csv
+
+# The database file, books.db in the working directory unless BOOKSTORE_DB names another one.
+DB_NAME = os.environ.get("BOOKSTORE_DB", "books.db")
+PAGE_SIZE = 100
+EXPORT_BATCH = 1000
+IMPORT_BATCH = 5000
+CSV_HEADER = ["ID", "Title", "Author", "Year", "ISBN", "Total"]
+CACHE_SIZE = 256
+CACHE_TTL = 60.0
+LOW_STOCK_THRESHOLD = 5
+
+_local = threading.local()
+
+# The database files whose schema connect() has brought up to date in this process.
+_migrated = set()
+_migrate_lock = threading.RLock()
+
+class BookError(Exception):
+    """Base class of the errors the backend reports to its callers."""
+
+class ValidationError(BookError):
+    """A book record or search value is missing or malformed."""
+
+class DuplicateIsbnError(BookError):
+    """A different book already uses the ISBN."""
+
+class BookNotFoundError(BookError):
+    """The book does not exist in the database."""
+
+class InsufficientStockError(BookError):
+    """More copies were to be removed than are in stock."""
+
+class LastCopiesError(BookError):
+    """The copies to remove are all that is in stock, and removing the book was not confirmed."""
+
+def get_connection():
+    """Return the connection of the current thread, opening and tuning it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.db_name != DB_NAME:
+        # use_database() switched to another file since this thread connected.
+        close_connection()
+        conn = None
+    if conn is None:
+        conn = sqlite3.connect(DB_NAME, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-16000")
+        conn.execute("PRAGMA busy_timeout=5000")
+        _local.conn = conn
+        _local.db_name = DB_NAME
+        with _migrate_lock:
+            # Create or migrate the schema the first time this process opens the file.
+            if DB_NAME not in _migrated:
+                connect()
+                _migrated.add(DB_NAME)
+    return conn
+
+def close_connection():
+    """Close the connection of the current thread, if one is open."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextlib.contextmanager
+def _write(conn):
+    """Run the block as one write: its own transaction, or a savepoint within write_batch().
+
+    The write lock is taken up front, so that no other writer can slip in between the checks
+    and the changes of the block.
+    """
+    if getattr(_local, "batch", False):
+        conn.execute("SAVEPOINT write")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK TO write")
+            conn.execute("RELEASE write")
+            raise
+        conn.execute("RELEASE write")
+    else:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield
+
+@contextlib.contextmanager
+def write_batch():
+    """Commit the writes made in the block on this thread together, in one transaction.
+
+    Each write keeps its own savepoint, so a write that fails is undone without the others.
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        _local.batch = True
+        try:
+            yield
+        finally:
+            _local.batch = False
+    # Readers may have cached rows from before the commit since the writes invalidated the cache.
+    invalidate_cache()
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_book_title_author_year ON book (title, author, year)",
+    "CREATE INDEX IF NOT EXISTS idx_book_author_year ON book (author, year)",
+    "CREATE INDEX IF NOT EXISTS idx_book_year ON book (year)",
+    "CREATE INDEX IF NOT EXISTS idx_book_total ON book (total)",
+]
+
+FTS_INSERT_TRIGGER = """CREATE TRIGGER IF NOT EXISTS book_fts_insert AFTER INSERT ON book BEGIN
+        INSERT INTO book_fts (rowid, title, author, isbn) VALUES (new.id, new.title, new.author, new.isbn);
+    END"""
+
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(
+        title, author, isbn, content='book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    FTS_INSERT_TRIGGER,
+    """CREATE TRIGGER IF NOT EXISTS book_fts_delete AFTER DELETE ON book BEGIN
+        INSERT INTO book_fts (book_fts, rowid, title, author, isbn) VALUES ('delete', old.id, old.title, old.author, old.isbn);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_update AFTER UPDATE OF title, author, isbn ON book BEGIN
+        INSERT INTO book_fts (book_fts, rowid, title, author, isbn) VALUES ('delete', old.id, old.title, old.author, old.isbn);
+        INSERT INTO book_fts (rowid, title, author, isbn) VALUES (new.id, new.title, new.author, new.isbn);
+    END""",
+    "INSERT INTO book_fts (book_fts) VALUES ('rebuild')",
+]
+
+# Every write to book is logged by book_id so that other windows can patch their listings.
+# Only the latest CHANGE_LOG_SIZE changes are kept; every CHANGE_LOG_TRIM changes the older ones are dropped.
+CHANGE_LOG_SIZE = 10000
+CHANGE_LOG_TRIM = 1000
+CHANGE_LOG = [
+    "CREATE TABLE IF NOT EXISTS book_change (seq INTEGER PRIMARY KEY, book_id INTEGER NOT NULL)",
+    """CREATE TRIGGER IF NOT EXISTS book_change_insert AFTER INSERT ON book BEGIN
+        INSERT INTO book_change (book_id) VALUES (new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_change_update AFTER UPDATE ON book BEGIN
+        INSERT INTO book_change (book_id) VALUES (new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_change_delete AFTER DELETE ON book BEGIN
+        INSERT INTO book_change (book_id) VALUES (old.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS book_change_trim AFTER INSERT ON book_change WHEN new.seq % {CHANGE_LOG_TRIM} = 0 BEGIN
+        DELETE FROM book_change WHERE seq <= new.seq - {CHANGE_LOG_SIZE};
+    END""",
+]
+
+fts_enabled = False
+
+def connect():
+    """Connect to the SQLite database, create the book table if it doesn't exist and migrate its indexes."""
+    global fts_enabled
+    conn = get_connection()
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS book (id INTEGER PRIMARY KEY, title TEXT, author TEXT, year INTEGER, isbn INTEGER, total INTEGER DEFAULT 1)")
+
+        try:
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_book_isbn ON book (isbn)")
+        except sqlite3.IntegrityError:
+            # Older databases may already hold duplicate ISBNs; index them without the constraint.
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_book_isbn ON book (isbn)")
+
+        for statement in INDEXES + CHANGE_LOG:
+            conn.execute(statement)
+
+        conn.execute("DELETE FROM book_change WHERE seq <= (SELECT MAX(seq) FROM book_change) - ?", (CHANGE_LOG_SIZE,))
+
+    # Without FTS5 in this SQLite build, advanced_search falls back to LIKE matching.
+    fts_enabled = _fts5_available(conn)
+    if fts_enabled and not _has_table(conn, "book_fts"):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another process may have built the index while this one waited for the lock.
+            if not _has_table(conn, "book_fts"):
+                for statement in FTS_SCHEMA:
+                    conn.execute(statement)
+
+    conn.execute("PRAGMA optimize")
+
+def _has_table(conn, name):
+    """Return True if the database of conn has a table with the given name."""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (name,)).fetchone() is not None
+
+def _fts5_available(conn):
+    """Return True if SQLite was built with the FTS5 extension."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(text)")
+    except sqlite3.OperationalError as e:
+        if "no such module" in str(e):
+            return False
+        raise
+    conn.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+def use_database(path):
+    """Switch every thread of this process to the database file at path, creating it if needed."""
+    global DB_NAME
+    DB_NAME = path
+    close_connection()
+    invalidate_cache()
+    with _low_stock_lock:
+        _low_stock["seq"] = None
+    get_connection()
+
+def fts_query(column, text):
+    """Build an FTS5 prefix query that matches every word of text in the given column."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return f"{column} : (" + " AND ".join(f'"{word}"*' for word in words) + ")"
+
+def get_book(id):
+    """Return the book record with the given ID, or None if it does not exist."""
+    return get_connection().execute("SELECT * FROM book WHERE id=?", (id,)).fetchone()
+
+def data_version():
+    """Return a number that changes whenever another connection commits to the database."""
+    return get_connection().execute("PRAGMA data_version").fetchone()[0]
+
+def last_change():
+    """Return the sequence number of the latest logged change."""
+    return get_connection().execute("SELECT COALESCE(MAX(seq), 0) FROM book_change").fetchone()[0]
+
+def changes_since(seq):
+    """Return the latest sequence number and the changes (id, row) logged after seq.
+
+    Each book appears once with its current record, or None if it was deleted. The changes
+    are None if the log no longer reaches back to seq and the listing has to be reloaded.
+    """
+    conn = get_connection()
+    first, last = conn.execute("SELECT MIN(seq), MAX(seq) FROM book_change").fetchone()
+    if last is None or last <= seq:
+        return seq, []
+    if first > seq + 1:
+        return last, None
+
+    cur = conn.execute("""SELECT change.book_id, book.* FROM
+                              (SELECT book_id, MAX(seq) AS seq FROM book_change WHERE seq > ? AND seq <= ? GROUP BY book_id) AS change
+                              LEFT JOIN book ON book.id = change.book_id ORDER BY change.seq""", (seq, last))
+    return last, [(row[0], row[1:] if row[1] is not None else None) for row in cur]
+
+# Query results are cached by function and normalized arguments, least recently used first.
+# Each entry is (expiry time, rows). Writes through this module clear the cache, and a change of
+# PRAGMA data_version on a thread's connection clears it for writes made by other processes.
+_cache = OrderedDict()
+_cache_lock = threading.RLock()
+_cache_generation = 0
+_cache_stats = {"hits": 0, "misses": 0}
+
+def cached(normalize=None):
+    """Cache the results of a query function, keyed by its arguments after normalize(arguments)."""
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            if normalize:
+                normalize(arguments)
+            # Records passed as page anchors may arrive as lists, e.g. from JSON.
+            key = (func.__name__,) + tuple(tuple(value) if isinstance(value, list) else value
+                                            for value in arguments.values())
+            return _cache_lookup(key, lambda: func(**arguments))
+
+        return wrapper
+    return decorate
+
+def _cache_lookup(key, query):
+    """Return the cached rows for key, running query() on a miss."""
+    version = data_version()
+    if getattr(_local, "data_version", None) != version:
+        # Another connection committed since this thread last looked.
+        _local.data_version = version
+        invalidate_cache()
+
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return list(entry[1])
+        _cache_stats["misses"] += 1
+        generation = _cache_generation
+
+    rows = query()
+
+    with _cache_lock:
+        # Do not store rows that a write may have made stale while the query ran.
+        if generation == _cache_generation:
+            _cache[key] = (now + CACHE_TTL, rows)
+            _cache.move_to_end(key)
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return list(rows)
+
+def invalidate_cache():
+    """Drop every cached query result."""
+    global _cache_generation
+    with _cache_lock:
+        _cache.clear()
+        _cache_generation += 1
+
+def cache_info():
+    """Return the cache hit and miss counters and its current size."""
+    with _cache_lock:
+        return {"hits": _cache_stats["hits"], "misses": _cache_stats["misses"], "size": len(_cache)}
+
+def _normalize_advanced_search(arguments):
+    """Reduce advanced search text to the lower-case words the full-text index matches on."""
+    for name in ("title", "author", "isbn"):
+        if arguments[name] and fts_enabled:
+            arguments[name] = " ".join(re.findall(r"\w+", arguments[name].lower())) or arguments[name]
+
+# The IDs of the books below LOW_STOCK_THRESHOLD, brought up to date from the change log on use.
+_low_stock = {"seq": None, "ids": frozenset()}
+_low_stock_lock = threading.Lock()
+
+def low_stock_ids():
+    """Return the IDs of the books with fewer than LOW_STOCK_THRESHOLD copies.
+
+    The set is built once and then only the books changed since the last call are re-checked.
+    """
+    with _low_stock_lock:
+        changes = None
+        if _low_stock["seq"] is not None:
+            seq, changes = changes_since(_low_stock["seq"])
+
+        if changes is None:
+            seq = last_change()
+            cur = get_connection().execute("SELECT id FROM book WHERE total < ?", (LOW_STOCK_THRESHOLD,))
+            ids = {row[0] for row in cur}
+        else:
+            ids = set(_low_stock["ids"])
+            for id, row in changes:
+                if row is not None and row[5] < LOW_STOCK_THRESHOLD:
+                    ids.add(id)
+                else:
+                    ids.discard(id)
+
+        _low_stock["seq"] = seq
+        _low_stock["ids"] = frozenset(ids)
+        return _low_stock["ids"]
+
+def _validate_book(title, year, isbn, total):
+    """Return the reason a new book record is invalid, or None if it can be stored."""
+    if not title or not isbn:
+        return "Please fill in the title and ISBN."
+
+    if not year or not str(year).isdigit() or len(str(year)) != 4:
+        return "Please enter a valid year (4 digits)."
+
+    if not isinstance(total, int) or total < 1:
+        return "Total must be a positive integer."
+
+    return None
+
+def insert(title, author, year, isbn, total):
+    """Insert a new book record into the database, or add total to the matching record.
+
+    Returns the change (id, row) with the added or merged record.
+    """
+    message = _validate_book(title, year, isbn, total)
+    if message:
+        raise ValidationError(message)
+
+    conn = get_connection()
+    with _write(conn):
+        cur = conn.cursor()
+
+        cur.execute("SELECT id, total FROM book WHERE title=? AND author=? AND year=? AND isbn=?", (title, author, year, isbn))
+        result = cur.fetchone()
+
+        cur.execute("SELECT * FROM book WHERE isbn=? AND (title!=? OR author!=? OR year!=?)", (isbn, title, author, year))
+        isbn_check = cur.fetchone()
+
+        if result:
+            id = result[0]
+            cur.execute("UPDATE book SET total = total + ? WHERE id=?", (total, id))
+        elif isbn_check:
+            raise DuplicateIsbnError("A different book with this ISBN already exists.")
+        else:
+            cur.execute("INSERT INTO book (title, author, year, isbn, total) VALUES (?, ?, ?, ?, ?)", (title, author, year, isbn, total))
+            id = cur.lastrowid
+
+    invalidate_cache()
+    return id, get_book(id)
+
+def view():
+    """Return all book records from the database."""
+    cur = get_connection().execute("SELECT * FROM book")
+    return cur.fetchall()
+
+# The position of each column in a book record.
+COLUMNS = ("id", "title", "author", "year", "isbn", "total")
+
+# Columns a listing can be sorted by, each with the tie-breakers that make the order total.
+# Every key matches the leading columns of an index, so sorted pages are index seeks.
+SORT_KEYS = {
+    "id": ("id",),
+    "title": ("title", "author", "year", "id"),
+    "author": ("author", "year", "id"),
+    "year": ("year", "id"),
+    "isbn": ("isbn", "id"),
+    "total": ("total", "id"),
+}
+
+def _page_order(order_by, descending, after):
+    """Return the keyset condition, its parameters and the ORDER BY clause of a sorted page."""
+    order_by = order_by or "id"
+    if order_by not in SORT_KEYS:
+        raise ValidationError(f"Cannot sort by {order_by!r}.")
+
+    columns = SORT_KEYS[order_by]
+    direction = " DESC" if descending else ""
+    order = " ORDER BY " + ", ".join(f"book.{column}{direction}" for column in columns)
+
+    if not after:
+        return "", [], order
+
+    # Resume after the sort key of the last record shown, taken from the record itself
+    # so that the page still follows it after the book was changed or deleted.
+    comparison = "<" if descending else ">"
+    if len(columns) == 1:
+        condition = f" AND book.id {comparison} ?"
+    else:
+        condition = f" AND ({', '.join(f'book.{column}' for column in columns)}) {comparison} ({', '.join('?' * len(columns))})"
+    return condition, [after[COLUMNS.index(column)] for column in columns], order
+
+@cached()
+def view_page(after=None, limit=PAGE_SIZE, order_by="id", descending=False):
+    """Return the page of book records that follows the record after in the given sort order."""
+    condition, params, order = _page_order(order_by, descending, after)
+    cur = get_connection().execute("SELECT * FROM book WHERE 1=1" + condition + order + " LIMIT ?", params + [limit])
+    return cur.fetchall()
+
+def _search_filter(title, author, year, isbn):
+    """Build the WHERE clause of search()."""
+    query = "1=1"
+    params = []
+
+    if title:
+        query += " AND title=?"
+        params.append(title)
+
+    if author:
+        query += " AND author=?"
+        params.append(author)
+
+    if year:
+        if not str(year).isdigit() or len(str(year)) != 4:
+            raise ValidationError("Please enter a valid year (4 digits) for search.")
+        query += " AND year=?"
+        params.append(year)
+
+    if isbn:
+        query += " AND isbn=?"
+        params.append(isbn)
+
+    return query, params
+
+@cached()
+def search(title="", author="", year="", isbn=""):
+    """Search for book records that match the given criteria."""
+    query, params = _search_filter(title, author, year, isbn)
+    cur = get_connection().execute("SELECT * FROM book WHERE " + query, params)
+    return cur.fetchall()
+
+@cached()
+def search_page(title="", author="", year="", isbn="", after=None, limit=PAGE_SIZE, order_by="id", descending=False):
+    """Return the page of search() results that follows the record after in the given sort order."""
+    query, params = _search_filter(title, author, year, isbn)
+    condition, order_params, order = _page_order(order_by, descending, after)
+    cur = get_connection().execute("SELECT * FROM book WHERE " + query + condition + order + " LIMIT ?",
+                                   params + order_params + [limit])
+    return cur.fetchall()
+
+def delete(id , total=1, remove_last=False):
+    """Delete the book record or decrease its total from the database.
+
+    Removing exactly the copies in stock deletes the record, which must be confirmed with
+    remove_last=True. Returns the change (id, row) with the remaining record, or with None
+    if the book was removed.
+    """
+    if not isinstance(total, int) or isinstance(total, bool) or total < 1:
+        raise ValidationError("Total must be a positive integer.")
+
+    conn = get_connection()
+    with _write(conn):
+        # Each statement checks the stock it changes, so concurrent sales can never lose a decrement.
+        if conn.execute("UPDATE book SET total = total - ? WHERE id=? AND total > ?", (total, id, total)).rowcount:
+            removed = False
+        elif remove_last and conn.execute("DELETE FROM book WHERE id=? AND total=?", (id, total)).rowcount:
+            removed = True
+        else:
+            result = conn.execute("SELECT total FROM book WHERE id=?", (id,)).fetchone()
+            if result is None:
+                raise BookNotFoundError("The selected book does not exist in the database.")
+            if result[0] == total:
+                raise LastCopiesError("These are all the copies in stock; removing them deletes the book.")
+            raise InsufficientStockError("The entered total is more than the quantity in stock. Please check the entered value and try again.")
+
+    invalidate_cache()
+    return id, None if removed else get_book(id)
+
+def delete_all(id):
+    """Delete all copies of the book record with the given ID from the database and return the change (id, None)."""
+    conn = get_connection()
+    with _write(conn):
+        conn.execute("DELETE FROM book WHERE id=?", (id,))
+    invalidate_cache()
+    return id, None
+
+def update(id, title, author, year, isbn, total):
+    """Update the book record with the given ID in the database and return the change (id, row)."""
+    if not id:
+        raise ValidationError("Please select a book to update.")
+
+    if not title or not author or not year or not isbn or total is None:
+        raise ValidationError("Please fill in all fields.")
+
+    if not str(year).isdigit() or len(str(year)) != 4:
+        raise ValidationError("Please enter a valid year (4 digits).")
+
+    if not str(total).isdigit() or int(total) < 1:
+        raise ValidationError("Total must be a positive integer.")
+
+    conn = get_connection()
+    with _write(conn):
+        cur = conn.cursor()
+
+        cur.execute("SELECT * FROM book WHERE isbn=? AND id!=?", (isbn, id))
+        if cur.fetchone():
+            raise DuplicateIsbnError("A different book with this ISBN already exists.")
+
+        cur.execute("UPDATE book SET title=?, author=?, year=?, isbn=?, total=? WHERE id=?",
+                    (title, author, year, isbn, total, id))
+        if not cur.rowcount:
+            raise BookNotFoundError("The selected book does not exist in the database.")
+
+    invalidate_cache()
+    return id, get_book(id)
+
+def open_csv(filename, mode):
+    """Open a CSV file as text, through gzip if its name ends in .gz."""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "t", newline="", encoding="utf-8")
+    return open(filename, mode, newline="", encoding="utf-8")
+
+def export_csv(filename="books_backup.csv"):
+    """Stream every book record to a CSV file, gzip-compressed if its name ends in .gz, and return the count."""
+    cur = get_connection().execute("SELECT * FROM book ORDER BY id")
+    count = 0
+
+    with open_csv(filename, "w") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        while True:
+            rows = cur.fetchmany(EXPORT_BATCH)
+            if not rows:
+                break
+            writer.writerows(rows)
+            count += len(rows)
+
+    return count
+
+def backup_to_csv(filename="books_backup.csv"):
+    """Backup the database to a CSV file and return its name."""
+    export_csv(filename)
+    return filename
+
+def import_csv(filename):
+    """Bulk import book records from a CSV file in the backup format, gzip-compressed if its name ends in .gz.
+
+    Rows are validated like insert(). A book that already exists, in the database or earlier in the
+    file, has the row's total added to it, and a row whose ISBN belongs to a different book is
+    rejected. Returns (added, merged, errors), where errors lists (line number, message) per rejected row.
+    """
+    with open_csv(filename, "r") as file:
+        reader = csv.reader(file)
+        return _import_rows((reader.line_num, row) for row in reader)
+
+def import_rows(header, rows):
+    """Bulk import (line number, CSV row) pairs under the given CSV header, like import_csv().
+
+    Meant for a file read elsewhere and sent in parts, each imported and committed on its own.
+    """
+    return _import_rows(itertools.chain([(0, header)], rows))
+
+def _import_rows(rows):
+    """Import the (line number, CSV row) pairs of a file, header first; see import_csv()."""
+    added = merged = 0
+    errors = []
+
+    rows = iter(rows)
+    header = [name.strip().lower() for name in next(rows, (0, []))[1]]
+    missing = [name for name in CSV_HEADER[1:] if name.lower() not in header]
+    if missing:
+        raise ValidationError(f"The CSV file has no {', '.join(missing)} column.")
+    columns = [header.index(name.lower()) for name in CSV_HEADER[1:]]
+
+    batch = []
+    for line, row in rows:
+        if not any(field.strip() for field in row):
+            # Blank lines, e.g. a trailing one, are not books.
+            continue
+        if len(row) < len(header):
+            errors.append((line, "The row has missing fields."))
+            continue
+        batch.append((line,) + tuple(row[column].strip() for column in columns))
+        if len(batch) == IMPORT_BATCH:
+            counts = _import_batch(batch, errors)
+            added, merged = added + counts[0], merged + counts[1]
+            batch = []
+
+    counts = _import_batch(batch, errors)
+    added, merged = added + counts[0], merged + counts[1]
+
+    errors.sort()
+    return added, merged, errors
+
+def _import_batch(batch, errors):
+    """Validate one batch of imported rows and write it in a single transaction; return (added, merged)."""
+    books = {}
+    for line, title, author, year, isbn, total in batch:
+        total = int(total) if total.isdigit() else total
+        message = _validate_book(title, year, isbn, total)
+        if message:
+            errors.append((line, message))
+            continue
+
+        # Match the values SQLite stores in the INTEGER year and isbn columns.
+        key = (title, author, int(year), int(isbn) if isbn.isdigit() else isbn)
+        if key in books:
+            books[key][0] += total
+        else:
+            books[key] = [total, line]
+
+    conn = get_connection()
+    with _write(conn):
+        existing = {}
+        keys = list(books)
+        for start in range(0, len(keys), 500):
+            isbns = [key[3] for key in keys[start:start + 500]]
+            cur = conn.execute(f"SELECT id, title, author, year, isbn FROM book WHERE isbn IN ({', '.join('?' * len(isbns))})", isbns)
+            for id, title, author, year, isbn in cur:
+                existing[isbn] = (id, (title, author, year, isbn))
+
+        updates = []
+        inserts = []
+        for key, (total, line) in books.items():
+            found = existing.get(key[3])
+            if found and found[1] == key:
+                updates.append((total, found[0]))
+            elif found:
+                errors.append((line, "A different book with this ISBN already exists."))
+            else:
+                existing[key[3]] = (None, key)
+                inserts.append(key + (total,))
+
+        conn.executemany("UPDATE book SET total = total + ? WHERE id=?", updates)
+        _insert_books(conn, inserts)
+
+    invalidate_cache()
+    return len(inserts), len(updates)
+
+def _insert_books(conn, books):
+    """Insert (title, author, year, isbn, total) records within the open transaction of conn."""
+    if books and fts_enabled:
+        # Index the new books with one statement, which is several times faster than the per-row trigger.
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM book").fetchone()[0]
+        conn.execute("DROP TRIGGER book_fts_insert")
+        conn.executemany("INSERT INTO book (title, author, year, isbn, total) VALUES (?, ?, ?, ?, ?)", books)
+        conn.execute("INSERT INTO book_fts (rowid, title, author, isbn) SELECT id, title, author, isbn FROM book WHERE id > ?", (last_id,))
+        conn.execute(FTS_INSERT_TRIGGER)
+    else:
+        conn.executemany("INSERT INTO book (title, author, year, isbn, total) VALUES (?, ?, ?, ?, ?)", books)
+
+def insert_many(books):
+    """Insert new (title, author, year, isbn, total) records in one transaction, without merging duplicates.
+
+    Meant for loading trusted data; an ISBN that is already taken raises sqlite3.IntegrityError.
+    """
+    books = list(books)
+    conn = get_connection()
+    with _write(conn):
+        _insert_books(conn, books)
+
+    invalidate_cache()
+    return len(books)
+
+def _advanced_filter(title, author, start_year, end_year, isbn):
+    """Build the FROM and WHERE clauses of advanced_search().
+
+    Returns (query, params, ranked), where ranked tells whether book_fts is joined and
+    the results can be ordered by relevance, or None if a text field holds no words.
+    """
+    params = []
+    matches = []
+
+    if fts_enabled:
+        for column, text in (("title", title), ("author", author), ("isbn", isbn)):
+            if text:
+                match = fts_query(column, text)
+                if match is None:
+                    return None
+                matches.append(match)
+
+    if matches:
+        query = "book_fts JOIN book ON book.id = book_fts.rowid WHERE book_fts MATCH ?"
+        params.append(" AND ".join(matches))
+    else:
+        query = "book WHERE 1=1"
+
+    if not fts_enabled:
+        # SQLite built without FTS5: fall back to substring matching.
+        for column, text in (("title", title), ("author", author), ("isbn", isbn)):
+            if text:
+                query += f" AND {column} LIKE ?"
+                params.append(f"%{text}%")
+
+    if start_year and start_year.isdigit():
+        query += " AND year >= ?"
+        params.append(start_year)
+
+    if end_year and end_year.isdigit():
+        query += " AND year <= ?"
+        params.append(end_year)
+
+    return query, params, bool(matches)
+
+@cached(_normalize_advanced_search)
+def advanced_search(title="", author="", start_year="", end_year="", isbn=""):
+    """Perform an advanced search for book records based on the given criteria.
+
+    Title, author and ISBN are matched by word prefix through the full-text index
+    and the results are ranked by relevance.
+    """
+    advanced_filter = _advanced_filter(title, author, start_year, end_year, isbn)
+    if advanced_filter is None:
+        return []
+
+    query, params, ranked = advanced_filter
+    query = "SELECT book.* FROM " + query
+    if ranked:
+        query += " ORDER BY book_fts.rank"
+
+    cur = get_connection().execute(query, params)
+    return cur.fetchall()
+
+@cached(_normalize_advanced_search)
+def advanced_search_page(title="", author="", start_year="", end_year="", isbn="", after=None, limit=PAGE_SIZE,
+                         order_by=None, descending=False):
+    """Return the page of advanced_search() results that follows the record after.
+
+    Without order_by, ranked results keep their relevance order and the others are ordered by ID.
+    Ranked records end with their rank, so that the last one can be passed back as after.
+    """
+    advanced_filter = _advanced_filter(title, author, start_year, end_year, isbn)
+    if advanced_filter is None:
+        return []
+
+    query, params, ranked = advanced_filter
+    if ranked and order_by is None:
+        query = "SELECT book.*, book_fts.rank FROM " + query
+        if after:
+            if len(after) <= len(COLUMNS):
+                raise ValidationError("Ranked pages resume after a record that ends with its rank.")
+            # Resume after the (rank, id) of the last record shown.
+            query += " AND (book_fts.rank, book.id) > (?, ?)"
+            params += [after[len(COLUMNS)], after[0]]
+        query += " ORDER BY book_fts.rank, book.id"
+    else:
+        condition, order_params, order = _page_order(order_by, descending, after)
+        query = "SELECT book.* FROM " + query + condition + order
+        params += order_params
+    params.append(limit)
+
+    cur = get_connection().execute(query + " LIMIT ?", params)
+    return cur.fetchall()
+
+@cached()
+def check_low_stock(threshold=LOW_STOCK_THRESHOLD):
+    """Check for books with stock lower than the specified threshold."""
+    cur = get_connection().execute("SELECT * FROM book WHERE total < ?", (threshold,))
+    return cur.fetchall()
+
+@cached()
+def low_stock_page(threshold=LOW_STOCK_THRESHOLD, after=None, limit=PAGE_SIZE, order_by="id", descending=False):
+    """Return the page of check_low_stock() results that follows the record after in the given sort order."""
+    condition, params, order = _page_order(order_by, descending, after)
+    cur = get_connection().execute("SELECT * FROM book WHERE total < ?" + condition + order + " LIMIT ?",
+                                   [threshold] + params + [limit])
+    return cur.fetchall()
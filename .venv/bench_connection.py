@@ -0,0 +1,113 @@
+"""Micro-benchmark: one connection per call versus the pooled backend connection.
+
+Run with ``python bench_connection.py [rows] [seconds]``. The benchmark works on a
+throwaway database in a temporary directory and never touches books.db.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import backend
+
+
+def seed(rows):
+    """Fill the book table with synthetic records."""
+    conn = backend.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO book (title, author, year, isbn, total) VALUES (?, ?, ?, ?, ?)",
+            ((f"Title {i}", f"Author {i % 500}", 1900 + i % 120, f"978-{i:010d}", i % 50 + 1) for i in range(rows)),
+        )
+
+
+def old_search(isbn):
+    """The search path as it was before pooling: connect, query, close."""
+    conn = sqlite3.connect(backend.DB_NAME)
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM book WHERE 1=1 AND isbn=?", [isbn])
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def old_low_stock(threshold):
+    """The low stock path as it was before pooling."""
+    conn = sqlite3.connect(backend.DB_NAME)
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM book WHERE total < ?", (threshold,))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def old_update(id):
+    """The stock update path as it was before pooling."""
+    conn = sqlite3.connect(backend.DB_NAME)
+    cur = conn.cursor()
+    cur.execute("UPDATE book SET total = total + ? WHERE id=?", (1, id))
+    conn.commit()
+    conn.close()
+
+
+def new_update(id):
+    """The same stock update through the pooled connection."""
+    conn = backend.get_connection()
+    with conn:
+        conn.execute("UPDATE book SET total = total + ? WHERE id=?", (1, id))
+
+
+def ops_per_sec(func, args, seconds):
+    """Call func repeatedly for the given seconds and return the achieved rate."""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        func(*args[count % len(args)])
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def compare(rows, seconds):
+    """Print the rate of every case before and after pooling on a catalogue of rows books."""
+    seed(rows)
+    isbns = [(f"978-{i:010d}",) for i in range(0, rows, max(rows // 100, 1))]
+    ids = [(i,) for i in range(1, rows + 1, max(rows // 100, 1))]
+
+    cases = [
+        ("search", old_search, lambda isbn: backend.search(isbn=isbn), isbns),
+        ("low stock", old_low_stock, backend.check_low_stock, [(5,)]),
+        ("stock update", old_update, new_update, ids),
+    ]
+
+    print(f"{rows} rows, {seconds:.1f}s per case")
+    print(f"{'operation':<14}{'before ops/s':>14}{'after ops/s':>14}{'speedup':>10}")
+    for name, before, after, args in cases:
+        old_rate = ops_per_sec(before, args, seconds)
+        new_rate = ops_per_sec(after, args, seconds)
+        print(f"{name:<14}{old_rate:>14.0f}{new_rate:>14.0f}{new_rate / old_rate:>9.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare one connection per call with the pooled backend connection.")
+    parser.add_argument("rows", nargs="?", type=int, default=10000, help="catalogue size (default: 10000)")
+    parser.add_argument("seconds", nargs="?", type=float, default=1.0, help="seconds per case (default: 1.0)")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="bookstore_bench_")
+    try:
+        backend.use_database(os.path.join(work_dir, "books.db"))
+        # Measure the connection handling, not the query result cache.
+        backend.CACHE_SIZE = 0
+        compare(args.rows, args.seconds)
+        backend.close_connection()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Benchmark the backend operations on synthetic catalogues of several sizes.
+
+    python benchmark.py
+    python benchmark.py --sizes 10000,100000,1000000,5000000 --json results.json
+
+Each catalogue is generated once with generate_catalogue.py, kept in --cache-dir and
+copied to a scratch file before every run, so books.db is never touched and every run
+starts from the same data. For each operation the script reports latency percentiles
+over the timed calls and the peak memory Python allocated during one more call.
+The query result cache is disabled unless --cached is given.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import backend
+import generate_catalogue
+
+
+def catalogue(size, seed, cache_dir):
+    """Return the path of the generated catalogue with size books, generating it on first use."""
+    path = os.path.join(cache_dir, f"catalogue_{size}_{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating {size} books into {path}...", file=sys.stderr)
+        partial = path + ".partial"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(partial + suffix):
+                os.remove(partial + suffix)
+        generate_catalogue.generate(partial, size, seed)
+        # Closing the last connection checkpoints the WAL into the file itself.
+        backend.close_connection()
+        os.replace(partial, path)
+    return path
+
+
+def operations(size, seed, repeat, full_repeat):
+    """Return the (name, calls) cases to time, each call taking no arguments.
+
+    The arguments are drawn up front so that preparing them is not part of the timings.
+    """
+    rng = random.Random(seed + 1)
+    conn = backend.get_connection()
+    max_id = conn.execute("SELECT MAX(id) FROM book").fetchone()[0]
+    # Books to look up are read from the catalogue itself so that every search has hits.
+    sample = [backend.get_book(rng.randint(1, max_id)) for _ in range(repeat)]
+    sample = [row for row in sample if row is not None]
+
+    new_books = [
+        (title, author, str(year), isbn, total)
+        for title, author, year, isbn, total in generate_catalogue.books(repeat, seed + 1)
+    ]
+    for i, book in enumerate(new_books):
+        # ISBNs past the catalogue size are guaranteed not to be taken yet.
+        new_books[i] = book[:3] + (generate_catalogue.isbn13(size + i),) + book[4:]
+    inserted = []
+
+    def insert(book):
+        inserted.append(backend.insert(*book))
+
+    def delete():
+        # Remove the books insert() added, which keeps the catalogue at its original size.
+        id, row = inserted.pop()
+        backend.delete(id, row[5], remove_last=True)
+
+    return [
+        ("insert", [lambda book=book: insert(book) for book in new_books]),
+        ("delete", [delete] * len(new_books)),
+        ("search isbn", [lambda row=row: backend.search(isbn=row[4]) for row in sample]),
+        ("search author", [lambda row=row: backend.search(author=row[2]) for row in sample]),
+        ("advanced search", [
+            lambda row=row: backend.advanced_search(title=row[1].split()[1][:4], author=row[2].split()[1])
+            for row in sample
+        ]),
+        ("advanced search years", [
+            lambda row=row: backend.advanced_search(author=row[2].split()[1], start_year=str(row[3]), end_year=str(row[3] + 10))
+            for row in sample
+        ]),
+        ("view page", [lambda row=row: backend.view_page(row) for row in sample]),
+        ("update", [
+            lambda row=row: backend.update(row[0], row[1], row[2], row[3], row[4], row[5] + 1)
+            for row in sample
+        ]),
+        ("check low stock", [backend.check_low_stock] * max(full_repeat, repeat // 10)),
+        ("view", [backend.view] * full_repeat),
+        ("backup to csv", [lambda: backend.backup_to_csv("benchmark_backup.csv")] * full_repeat),
+    ]
+
+
+def percentile(values, p):
+    """Return the p-th percentile of the sorted values by the nearest-rank method."""
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def measure(calls):
+    """Return the latency statistics of the calls and the peak memory of the last one.
+
+    The first call only warms up the statement cache and the SQLite page cache.
+    """
+    calls[0]()
+
+    latencies = []
+    for call in calls[1:-1]:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    # Tracing slows every allocation down, so memory is measured apart from the timings.
+    tracemalloc.start()
+    calls[-1]()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "calls": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "ops_per_s": len(latencies) / max(sum(latencies), 1e-9),
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(size, seed, repeat, full_repeat, cache_dir, work_dir):
+    """Benchmark every operation on a fresh copy of the catalogue with size books."""
+    source = catalogue(size, seed, cache_dir)
+    work = os.path.join(work_dir, "benchmark.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(work + suffix):
+            os.remove(work + suffix)
+    shutil.copyfile(source, work)
+    backend.use_database(work)
+
+    results = []
+    for name, calls in operations(size, seed, repeat, full_repeat):
+        stats = measure(calls)
+        results.append(dict(size=size, operation=name, **stats))
+        print(f"{size:>9} {name:<22}{stats['calls']:>7}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}"
+              f"{stats['p99_ms']:>10.3f}{stats['max_ms']:>10.3f}{stats['ops_per_s']:>11.0f}{stats['peak_kib']:>11.0f}",
+              flush=True)
+
+    backend.close_connection()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backend operations on synthetic catalogues.")
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma-separated catalogue sizes, from 10000 to 5000000 (default: 10000,100000)")
+    parser.add_argument("--seed", type=int, default=0, help="catalogue seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per operation (default: 200)")
+    parser.add_argument("--full-repeat", type=int, default=5,
+                        help="calls for the operations that read the whole catalogue (default: 5)")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "bookstore_catalogues"),
+                        help="directory to keep the generated catalogues in")
+    parser.add_argument("--cached", action="store_true", help="keep the query result cache enabled")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    if args.repeat < 3 or args.full_repeat < 3:
+        parser.error("--repeat and --full-repeat must be at least 3")
+    if not args.cached:
+        backend.CACHE_SIZE = 0
+
+    cache_dir = os.path.abspath(args.cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="bookstore_bench_")
+    cwd = os.getcwd()
+    # Run in the scratch directory so that the backup CSV does not land next to the sources.
+    os.chdir(work_dir)
+
+    print(f"{'books':>9} {'operation':<22}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}{'ops/s':>11}{'peak KiB':>11}")
+    results = []
+    try:
+        for size in sizes:
+            results += run(size, args.seed, args.repeat, args.full_repeat, cache_dir, work_dir)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
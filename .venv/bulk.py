@@ -0,0 +1,51 @@
+"""Headless bulk import and export of the book catalogue.
+
+    python bulk.py export books.csv.gz
+    python bulk.py import publisher_feed.csv
+    python bulk.py --db /srv/store/books.db export books.csv
+
+Files ending in .gz are read and written gzip-compressed. Import exits with status 1
+if any row was rejected; the rejected rows are listed on stderr.
+"""
+import argparse
+import sys
+import time
+
+import backend
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import and export of the book catalogue.")
+    parser.add_argument("--db", help=f"database file to use instead of {backend.DB_NAME}")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("export", help="write every book to a CSV file").add_argument("filename")
+    commands.add_parser("import", help="add the books of a CSV file").add_argument("filename")
+    args = parser.parse_args(argv)
+    if args.db:
+        backend.use_database(args.db)
+
+    start = time.perf_counter()
+
+    if args.command == "export":
+        count = backend.export_csv(args.filename)
+        elapsed = time.perf_counter() - start
+        print(f"Exported {count} books to {args.filename} in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} rows/s).")
+        return 0
+
+    try:
+        added, merged, errors = backend.import_csv(args.filename)
+    except backend.BookError as e:
+        print(f"{args.filename}: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    for line, message in errors:
+        print(f"{args.filename}:{line}: {message}", file=sys.stderr)
+
+    rows = added + merged + len(errors)
+    print(f"Added {added} books, merged {merged} into existing books and rejected {len(errors)} rows "
+          f"in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s).")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,691 @@
+from tkinter import *
+from tkinter import ttk
+import os
+from tkinter import messagebox, END
+from tkinter import Toplevel
+from tkinter import filedialog
+from concurrent.futures import ThreadPoolExecutor
+import queue
+
+# Share one database between several counters through service.py when BOOKSTORE_SERVICE is set.
+if os.environ.get("BOOKSTORE_SERVICE"):
+    import service_client as backend
+else:
+    import backend
+
+selected_tuple = None
+
+COLUMNS = ("ID", "Title", "Author", "Year", "ISBN", "Total")
+
+# Sorting is done by the backend; sort_state remembers the last direction of every column.
+# With sort_by set to None listings keep their natural order: by ID, or by relevance for searches.
+sort_by = None
+sort_descending = False
+sort_state = {}
+
+LOW_STOCK = backend.LOW_STOCK_THRESHOLD
+MAX_LOADED_PAGES = 3
+
+# The tree only holds a sliding window of MAX_LOADED_PAGES pages of the current listing.
+# page_source(after, order_by, descending) fetches the page that follows the record after,
+# page_starts[i] is the record that fetches page i (None for the first) and loaded_pages
+# holds [page index, row count] per loaded page.
+page_source = None
+page_starts = [None]
+loaded_pages = []
+at_last_page = True
+paging = False
+
+# Changes committed by other windows are picked up by polling the database every WATCH_INTERVAL ms.
+WATCH_INTERVAL = 1000
+seen_version = None
+seen_change = 0
+
+# Slow backend calls run on a worker pool; their results are handed back to the Tk main loop
+# through finished_tasks, which is drained every RESULT_INTERVAL ms. listing_request numbers the
+# listings so that a slow search cannot replace the results of a newer one, and shown_listing is
+# the number of the listing on screen, whose later pages are loaded in the background as well.
+RESULT_INTERVAL = 50
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="backend")
+finished_tasks = queue.Queue()
+running_tasks = 0
+listing_request = 0
+shown_listing = 0
+
+def sort_column(column):
+    """Sort the current listing by the given column, reversing the direction on each click."""
+    global sort_by, sort_descending
+    sort_by = column
+    sort_descending = sort_state[column] = not sort_state.get(column, True)
+    show_sort_arrows()
+
+    if page_source is not None:
+        show_listing(page_source)
+
+def reset_sort():
+    """Return listings to their natural order."""
+    global sort_by, sort_descending
+    sort_by = None
+    sort_descending = False
+    show_sort_arrows()
+
+def show_sort_arrows():
+    """Mark the sorted column heading with the sort direction."""
+    for name in COLUMNS:
+        arrow = (" \u25bc" if sort_descending else " \u25b2") if name.lower() == sort_by else ""
+        tree.heading(name, text=name + arrow)
+
+def page_task(source, after):
+    """Return a call that fetches the page of source following the record after, in the current sort order."""
+    order = {"order_by": sort_by, "descending": sort_descending}
+    return lambda: source(after, **order) or []
+
+def row_tags(row):
+    """Return the treeview tags of a book record, highlighting it when stock is low."""
+    return ("low_stock" if int(row[5]) < LOW_STOCK else "",)
+
+def insert_row(row, index=END):
+    """Insert a book record into the treeview, using its ID as the item ID."""
+    iid = str(row[0])
+    if tree.exists(iid):
+        # The book moved between pages since it was loaded.
+        tree.delete(iid)
+    tree.insert("", index, iid=iid, values=row[:len(COLUMNS)], tags=row_tags(row))
+
+def remove_row(iid):
+    """Delete an item from the treeview and keep the page bookkeeping in step."""
+    position = tree.index(iid)
+    for page in loaded_pages:
+        if position < page[1]:
+            break
+        position -= page[1]
+
+    # A page that resumes after this book keeps its place, since it resumes after the record's values.
+    page[1] -= 1
+    tree.delete(iid)
+
+def apply_change(change):
+    """Patch the treeview with a change (id, row) from the backend instead of reloading the listing."""
+    book_id, row = change
+    iid = str(book_id)
+
+    if tree.exists(iid):
+        if row is None:
+            remove_row(iid)
+        else:
+            tree.item(iid, values=row, tags=row_tags(row))
+
+    elif row is not None and page_source is backend.view_page and not sort_by and at_last_page:
+        # A new book belongs at the end of the full listing in ID order.
+        insert_row(row)
+        loaded_pages[-1][1] += 1
+
+def watch_database():
+    """Apply the changes other windows committed since the last check, polling in the background."""
+    version, change = seen_version, seen_change
+
+    def poll():
+        new_version = backend.data_version()
+        if new_version == version:
+            return new_version, change, []
+        return (new_version,) + tuple(backend.changes_since(change))
+
+    def polled(result):
+        global seen_version, seen_change
+        window.after(WATCH_INTERVAL, watch_database)
+        if (seen_version, seen_change) != (version, change):
+            # mark_changes_seen() moved on while the poll ran.
+            return
+
+        seen_version, seen_change, changes = result
+        if changes is None or len(changes) > backend.PAGE_SIZE:
+            # Reloading one page is cheaper than patching many rows, e.g. during an import.
+            if page_source is not None:
+                show_listing(page_source)
+        else:
+            for logged in changes:
+                apply_change(logged)
+
+    def failed(e):
+        window.after(WATCH_INTERVAL, watch_database)
+        window.report_callback_exception(type(e), e, e.__traceback__)
+
+    run_in_background(poll, polled, on_error=failed, quiet=True)
+
+def run_in_background(task, on_success, *args, on_error=None, quiet=False):
+    """Run task(*args) on the worker pool and pass its result to on_success on the Tk main loop.
+
+    An error goes to on_error, by default handle_error(). Quiet tasks leave the cursor alone.
+    """
+    global running_tasks
+    if not quiet:
+        running_tasks += 1
+        window.config(cursor="watch")
+    future = executor.submit(task, *args)
+    future.add_done_callback(lambda future: finished_tasks.put((future, on_success, on_error or handle_error, quiet)))
+
+def deliver_results():
+    """Hand the results of finished background tasks to their callbacks."""
+    global running_tasks
+    try:
+        while True:
+            try:
+                future, on_success, on_error, quiet = finished_tasks.get_nowait()
+            except queue.Empty:
+                break
+
+            if not quiet:
+                running_tasks -= 1
+                if not running_tasks:
+                    window.config(cursor="")
+            try:
+                on_success(future.result())
+            except Exception as e:
+                on_error(e)
+    finally:
+        window.after(RESULT_INTERVAL, deliver_results)
+
+def show_listing(source, on_shown=None):
+    """Fetch the first page of a listing in the background, show it and pass its rows to on_shown."""
+    global listing_request
+    listing_request += 1
+    request = listing_request
+
+    def shown(rows):
+        global shown_listing
+        if request != listing_request:
+            return
+        shown_listing = request
+        show_pages(source, rows)
+        if on_shown:
+            on_shown(rows)
+
+    run_in_background(page_task(source, None), shown)
+
+def mark_changes_seen():
+    """Skip the logged changes up to now, after the listing was reloaded anyway."""
+    def fetched(position):
+        global seen_version, seen_change
+        seen_version, seen_change = position
+
+    run_in_background(lambda: (backend.data_version(), backend.last_change()), fetched, quiet=True)
+
+def show_pages(source, rows):
+    """Show rows as the first page of a listing in the treeview."""
+    global page_source, page_starts, loaded_pages, at_last_page
+    tree.delete(*tree.get_children())
+    page_source = source
+    page_starts = [None]
+    loaded_pages = []
+    at_last_page = True
+
+    for row in rows:
+        insert_row(row)
+
+    loaded_pages.append([0, len(rows)])
+    at_last_page = len(rows) < backend.PAGE_SIZE
+    if rows and not at_last_page:
+        page_starts.append(rows[-1])
+    tree.yview_moveto(0)
+
+def load_page(index, on_loaded):
+    """Fetch page index of the shown listing in the background and pass it to on_loaded(index, rows)."""
+    global paging
+    paging = True
+    listing = shown_listing
+
+    def loaded(rows):
+        global paging
+        paging = False
+        # Drop the page if another listing was shown while it loaded.
+        if listing == shown_listing:
+            on_loaded(index, rows)
+
+    def failed(e):
+        global paging
+        paging = False
+        handle_error(e)
+
+    run_in_background(page_task(page_source, page_starts[index]), loaded, on_error=failed)
+
+def load_next_page():
+    """Append the page after the loaded window and drop the first page if the window is full."""
+    load_page(loaded_pages[-1][0] + 1, append_page)
+
+def append_page(index, rows):
+    """Append the loaded page index to the tree."""
+    global at_last_page
+    at_last_page = len(rows) < backend.PAGE_SIZE
+    if not rows:
+        return
+
+    if index + 1 == len(page_starts) and not at_last_page:
+        page_starts.append(rows[-1])
+
+    for row in rows:
+        insert_row(row)
+    loaded_pages.append([index, len(rows)])
+
+    if len(loaded_pages) > MAX_LOADED_PAGES:
+        top = tree.yview()[0] * len(tree.get_children())
+        dropped = loaded_pages.pop(0)[1]
+        tree.delete(*tree.get_children()[:dropped])
+        tree.yview_moveto((top - dropped) / len(tree.get_children()))
+
+def load_previous_page():
+    """Prepend the page before the loaded window and drop the last page if the window is full."""
+    load_page(loaded_pages[0][0] - 1, prepend_page)
+
+def prepend_page(index, rows):
+    """Prepend the loaded page index to the tree."""
+    global at_last_page
+    top = tree.yview()[0] * len(tree.get_children())
+    for position, row in enumerate(rows):
+        insert_row(row, position)
+    loaded_pages.insert(0, [index, len(rows)])
+
+    if len(loaded_pages) > MAX_LOADED_PAGES:
+        dropped = loaded_pages.pop()[1]
+        tree.delete(*tree.get_children()[-dropped:])
+        at_last_page = False
+
+    tree.yview_moveto((top + len(rows)) / len(tree.get_children()))
+
+def on_tree_scroll(first, last):
+    """Update the scrollbar and load neighbouring pages as the window nears either end."""
+    scrollbar.set(first, last)
+    if paging or page_source is None:
+        return
+
+    if float(last) > 0.9 and not at_last_page:
+        load_next_page()
+    elif float(first) < 0.1 and loaded_pages and loaded_pages[0][0] > 0:
+        load_previous_page()
+
+def get_selected_row(event):
+    """Retrieve the selected row data and display it in the input fields."""
+    global selected_tuple
+    selected = tree.focus()
+    if not selected:
+        return
+    selected_tuple = tree.item(selected, 'values')
+    entries = [e1, e2, e3, e4, e5]
+    for i, entry in enumerate(entries, start=1):
+        entry.delete(0, END)
+        entry.insert(END, selected_tuple[i])
+
+def add_command():
+    """Add a new book record to the database."""
+    try:
+        title = title_text.get()
+        author = author_text.get()
+        year = year_text.get()
+        isbn = isbn_text.get()
+        total = total_text.get()
+
+        if not title or not author or not year or not isbn or not total:
+            messagebox.showwarning("Warning", "Please fill in all fields.")
+            return
+
+        if total == "" or total <= 0:
+            messagebox.showwarning("Warning", "Total must be a positive number.")
+            return
+
+        total = int(total)
+        change = backend.insert(title, author, year, isbn, total)
+
+        # A merged record holds more copies than were just added.
+        if change[1][5] > total:
+            messagebox.showinfo("Success", f"The number of books was updated by {total}.")
+        else:
+            messagebox.showinfo("Success", f"Book '{title}' added successfully!")
+
+        apply_change(change)
+        new_command()
+
+    except Exception as e:
+        handle_error(e)
+
+def view_command():
+    """View all records in the database."""
+    new_command()
+    show_listing(backend.view_page)
+
+def search_command():
+    """Search for records that match the input criteria."""
+    try:
+            title = title_text.get().strip()
+            author = author_text.get().strip()
+            year = year_text.get().strip()
+            isbn = isbn_text.get().strip()
+
+            if not title and not author and not year and not isbn:
+                messagebox.showwarning("Warning", "Please fill in at least one field to search.")
+                view_command()
+                return
+
+            def shown(rows):
+                if not rows:
+                    messagebox.showinfo("Info", "No results found.")
+                    view_command()
+
+            show_listing(lambda after, **order: backend.search_page(title, author, year, isbn, after, **order), shown)
+    except Exception as e:
+        handle_error(e)
+
+def delete_command():
+    """Delete the selected book record from the database."""
+    try:
+        if not selected_tuple:
+            messagebox.showwarning("Warning", "Please select a book to delete.")
+            return
+
+        total_to_delete = int(total_text.get())
+
+        if total_to_delete <= 0:
+            messagebox.showwarning("Warning", "Please enter a valid number greater than 0.")
+            return
+
+        try:
+            change = backend.delete(selected_tuple[0], total_to_delete)
+        except backend.LastCopiesError:
+            # The backend decides on the current stock whether this removes the book.
+            confirm = messagebox.askyesno("Confirmation", "Are you sure you want to delete all of this book?")
+
+            if not confirm:
+                return
+
+            change = backend.delete(selected_tuple[0], total_to_delete, remove_last=True)
+        if change[1] is not None:
+            messagebox.showinfo("Success", f"The number of books was updated by {total_to_delete}.")
+
+        apply_change(change)
+        new_command()
+
+    except Exception as e:
+        handle_error(e)
+        view_command()
+
+def delete_all_command():
+    """Delete all book records from the database."""
+    try:
+        if not selected_tuple:
+            messagebox.showwarning("Warning", "Please select a book to delete.")
+            return
+
+        confirm = messagebox.askyesno("Confirmation", "Are you sure you want to delete all of this book?")
+
+        if not confirm:
+            return
+
+        change = backend.delete_all(selected_tuple[0])
+        messagebox.showinfo("Success", "All of the books were deleted.")
+
+        apply_change(change)
+        new_command()
+
+    except Exception as e:
+        handle_error(e)
+
+def update_command():
+    """Update the selected book record in the database."""
+    try:
+        if not selected_tuple:
+            messagebox.showwarning("Warning", "Please select a book to update.")
+            return
+
+        title = title_text.get()
+        author = author_text.get()
+        year = year_text.get()
+        isbn = isbn_text.get()
+        total = total_text.get()
+
+        if not title or not author or not year or not isbn:
+            messagebox.showwarning("Warning", "Please fill in all fields.")
+            return
+
+        change = backend.update(selected_tuple[0], title, author, year, isbn, total)
+        messagebox.showinfo("Success", "Book was updated successfully.")
+
+        apply_change(change)
+        new_command()
+
+    except Exception as e:
+        handle_error(e)
+
+def new_command():
+    """Clear the input fields for a new entry."""
+    e1.delete(0, END)
+    e2.delete(0, END)
+    e3.delete(0, END)
+    e4.delete(0, END)
+    e5.delete(0, END)
+    global selected_tuple
+    selected_tuple = None
+
+def backup_command():
+    """Create a backup of the database and save it to a CSV file."""
+    run_in_background(backend.backup_to_csv, lambda filename: messagebox.showinfo(
+        "Success", f"Backup completed successfully!\nFile saved as: {filename}"))
+
+def import_command():
+    """Import the books of a CSV file in the backup format."""
+    filename = filedialog.askopenfilename(title="Import Books",
+                                          filetypes=[("CSV files", "*.csv *.csv.gz"), ("All files", "*.*")])
+    if not filename:
+        return
+
+    def imported(report):
+        added, merged, errors = report
+        view_command()
+        mark_changes_seen()
+
+        message = f"Added {added} books and merged {merged} into existing books."
+        if errors:
+            shown = "\n".join(f"Line {line}: {error}" for line, error in errors[:10])
+            more = f"\n... and {len(errors) - 10} more." if len(errors) > 10 else ""
+            messagebox.showwarning("Import", f"{message}\n{len(errors)} rows were rejected:\n{shown}{more}")
+        else:
+            messagebox.showinfo("Import", message)
+
+    run_in_background(backend.import_csv, imported, filename)
+
+def open_advanced_search():
+    """Open the advanced search window."""
+    top = Toplevel(window)
+    top.title("Advanced Search")
+
+    top.geometry("350x200")
+    top.resizable(False, False)
+
+    l1 = Label(top, text="Title (Word Starts With)")
+    l1.grid(row=0, column=0)
+    title_filter_text = StringVar()
+    e1 = Entry(top, textvariable=title_filter_text)
+    e1.grid(row=0, column=1)
+
+    l6 = Label(top, text="Start Date (Year)")
+    l6.grid(row=1, column=0)
+    start_year_text = StringVar()
+    validate_year_cmd = top.register(validate_year)
+    e6 = Entry(top, textvariable=start_year_text, validate="key", validatecommand=(validate_year_cmd, "%P"))
+    e6.grid(row=1, column=1)
+
+    l7 = Label(top, text="End Date (Year)")
+    l7.grid(row=2, column=0)
+    end_year_text = StringVar()
+    e7 = Entry(top, textvariable=end_year_text, validate="key", validatecommand=(validate_year_cmd, "%P"))
+    e7.grid(row=2, column=1)
+
+    l8 = Label(top, text="Author (Word Starts With)")
+    l8.grid(row=3, column=0)
+    author_filter_text = StringVar()
+    e8 = Entry(top, textvariable=author_filter_text)
+    e8.grid(row=3, column=1)
+
+    l9 = Label(top, text="ISBN (Word Starts With)")
+    l9.grid(row=4, column=0)
+
+    isbn_filter_text = StringVar()
+    e9 = Entry(top, textvariable=isbn_filter_text)
+    e9.grid(row=4, column=1)
+
+    b10 = Button(top, text="Search",command=lambda: advanced_search_command(title_filter_text.get(), author_filter_text.get(),
+                                                             start_year_text.get(), end_year_text.get(),
+                                                             isbn_filter_text.get(), top))
+    b10.grid(row=5, columnspan=2)
+
+def advanced_search_command(title, author, start_year, end_year, isbn, top_window):
+    """Perform an advanced search based on the input criteria."""
+    if not title and not author and not start_year and not end_year and not isbn:
+        messagebox.showwarning("Warning", "Please fill in at least one field to search.")
+        return
+
+    def shown(rows):
+        if not rows:
+            messagebox.showinfo("Info", "No results found.")
+        if top_window.winfo_exists():
+            top_window.destroy()
+
+    reset_sort()
+    show_listing(lambda after, **order: backend.advanced_search_page(title, author, start_year, end_year, isbn, after, **order), shown)
+
+def low_stock_command():
+    """Check and display books with low stock."""
+    threshold = LOW_STOCK
+
+    def counted(count):
+        if not count:
+            messagebox.showinfo("Info", f"No books with stock less than {threshold}.")
+            return
+
+        show_listing(lambda after, **order: backend.low_stock_page(threshold, after, **order),
+                     lambda rows: messagebox.showwarning("Low Stock", f"{count} books with stock less than {threshold} are displayed."))
+
+    run_in_background(lambda: len(backend.low_stock_ids()), counted)
+
+def validate_year(new_value):
+    """Validate that the year input is a four-digit number."""
+    if new_value.isdigit() and len(new_value) <= 4:
+        return True
+    elif new_value == "":
+        return True
+    else:
+        return False
+
+def get_total_input(new_value):
+    """Validate that the total input is a digit number."""
+    if new_value.isdigit() or new_value == "":
+        return True
+    else:
+        return False
+
+def handle_error(e):
+    """Show an error in a dialog, with backend validation errors as warnings."""
+    if isinstance(e, backend.ValidationError):
+        messagebox.showwarning("Warning", str(e))
+    elif isinstance(e, backend.BookError):
+        messagebox.showerror("Error", str(e))
+    else:
+        messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+window = Tk()
+window.wm_title("Book Store")
+
+window.geometry("1200x300")
+window.resizable(False, False)
+
+# inputs
+l1 = Label(window, text="Title")
+l1.grid(row=0, column=0)
+
+l2 = Label(window, text="Author")
+l2.grid(row=0, column=2)
+
+l3 = Label(window, text="Year")
+l3.grid(row=1, column=0)
+
+l4 = Label(window, text="ISBN")
+l4.grid(row=1, column=2)
+
+l5 = Label(window, text="Total")
+l5.grid(row=2, column=0)
+
+title_text = StringVar()
+e1 = Entry(window, textvariable=title_text)
+e1.grid(row=0, column=1)
+
+author_text = StringVar()
+e2 = Entry(window, textvariable=author_text)
+e2.grid(row=0, column=3)
+
+vcmd = window.register(validate_year)
+year_text = StringVar()
+e3 = Entry(window, textvariable=year_text, validate="key", validatecommand=(vcmd, "%P"))
+e3.grid(row=1, column=1)
+
+isbn_text = StringVar()
+e4 = Entry(window, textvariable=isbn_text)
+e4.grid(row=1, column=3)
+
+gti = window.register(get_total_input)
+total_text = IntVar()
+e5 = Entry(window, textvariable=total_text, validate="key", validatecommand=(gti, "%P"))
+e5.grid(row=2, column=1)
+
+# list
+tree = ttk.Treeview(window, columns=COLUMNS, show="headings", height=8)
+tree.grid(row=4, column=0, columnspan=6)
+tree.tag_configure("low_stock", background="yellow")
+
+scrollbar = ttk.Scrollbar(window, orient=VERTICAL, command=tree.yview)
+scrollbar.grid(row=4, column=6, sticky="ns")
+tree.configure(yscrollcommand=on_tree_scroll)
+
+for name in COLUMNS:
+    tree.heading(name, text=name, command=lambda column=name.lower(): sort_column(column))
+
+tree.bind('<ButtonRelease-1>', get_selected_row)
+
+# buttons
+b1 = Button(window, text="View all", width=12, command=view_command)
+b1.grid(row=3, column=0)
+
+b2 = Button(window, text="Search Book", width=12, command=search_command)
+b2.grid(row=3, column=1)
+
+b3 = Button(window, text="Add Book", width=12, command=add_command)
+b3.grid(row=1, column=4)
+
+b4 = Button(window, text="Update Book", width=12, command=update_command)
+b4.grid(row=3, column=3)
+
+b5 = Button(window, text="Delete selected", width=12, command=delete_command)
+b5.grid(row=3, column=4)
+
+b6 = Button(window, text="Close", width=12, command=window.destroy)
+b6.grid(row=0, column=5)
+
+b7 = Button(window, text="New", width=12, command=new_command)
+b7.grid(row=0, column=4)
+
+b8 = Button(window, text="Delete All", width=12, command=delete_all_command)
+b8.grid(row=3, column=5)
+
+b9 = Button(window, text="Backup", width=12, command=backup_command)
+b9.grid(row=1, column=5)
+
+b10_main = Button(window, text="Advanced Search", width=12, command=open_advanced_search)
+b10_main.grid(row=3, column=2)
+
+b11 = Button(window, text="Low Stock", width=12, command=low_stock_command)
+b11.grid(row=2, column=5)
+
+b12 = Button(window, text="Import", width=12, command=import_command)
+b12.grid(row=2, column=4)
+
+mark_changes_seen()
+view_command()
+window.after(WATCH_INTERVAL, watch_database)
+window.after(RESULT_INTERVAL, deliver_results)
+window.mainloop()
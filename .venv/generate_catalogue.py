@@ -0,0 +1,111 @@
+"""Generate a synthetic book catalogue for benchmarks and load tests.
+
+    python generate_catalogue.py catalogue_100k.db 100000
+    python generate_catalogue.py catalogue_5m.db 5000000 --seed 7
+
+The same count and seed always produce the same books: titles and authors drawn from
+word lists, years from 1800 to 2024, unique valid ISBN-13s and about 2% of the books
+below the low stock threshold.
+"""
+import argparse
+import random
+import sys
+import time
+
+import backend
+
+ADJECTIVES = [
+    "Silent", "Broken", "Golden", "Hidden", "Last", "Lost", "Crimson", "Distant", "Endless", "Fallen",
+    "Forgotten", "Frozen", "Burning", "Quiet", "Secret", "Shattered", "Wandering", "Wild", "Winter", "Hollow",
+    "Iron", "Little", "Midnight", "Northern", "Painted", "Restless", "Scarlet", "Sunken", "Velvet", "Bitter",
+]
+NOUNS = [
+    "River", "Garden", "Empire", "Mirror", "Kingdom", "Harbor", "Forest", "Station", "Letter", "Island",
+    "Orchard", "Lantern", "Voyage", "Machine", "Daughter", "Witness", "Mountain", "Storm", "City", "Promise",
+    "Shadow", "Bridge", "Crown", "Desert", "Engine", "Fortune", "House", "Journey", "Ocean", "Signal",
+]
+SUBJECTS = [
+    "Memory", "Time", "Silence", "Glass", "Salt", "Stars", "Dust", "Ashes", "Thunder", "Bones",
+    "Water", "Light", "Smoke", "Roses", "Wolves", "Clocks", "Ghosts", "Kings", "Tides", "Maps",
+]
+FIRST_NAMES = [
+    "Anna", "Ben", "Clara", "David", "Elena", "Farid", "Grace", "Hugo", "Ines", "Jonas",
+    "Kira", "Leo", "Maya", "Nadia", "Omar", "Paula", "Quentin", "Rosa", "Samir", "Tara",
+    "Umar", "Vera", "Walter", "Xenia", "Yusuf", "Zoe", "Amir", "Beatrix", "Cyrus", "Dalia",
+]
+LAST_NAMES = [
+    "Abbott", "Bauer", "Castillo", "Dubois", "Eriksen", "Fischer", "Garcia", "Hashemi", "Ivanova", "Jensen",
+    "Kowalski", "Larsen", "Moreau", "Nakamura", "Okafor", "Petrov", "Quinn", "Rahimi", "Santos", "Tanaka",
+    "Ulrich", "Vargas", "Weber", "Xu", "Yilmaz", "Zimmermann", "Novak", "Haddad", "Lindqvist", "Costa",
+]
+
+# Fraction of the books generated with fewer than LOW_STOCK_THRESHOLD copies.
+LOW_STOCK_SHARE = 0.02
+
+# ISBN bodies are spread over the 9-digit range with a multiplier coprime to 10**9,
+# so that every book number maps to a different ISBN.
+ISBN_MULTIPLIER = 387420489
+
+
+def isbn13(number):
+    """Return the number-th ISBN-13 in the 978 prefix, formatted as 978-XXXXXXXXXX."""
+    body = f"978{number * ISBN_MULTIPLIER % 10 ** 9:09d}"
+    check = -sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(body)) % 10
+    return f"{body[:3]}-{body[3:]}{check}"
+
+
+def books(count, seed=0):
+    """Yield count (title, author, year, isbn, total) records, the same ones for the same seed."""
+    rng = random.Random(seed)
+    for number in range(count):
+        title = f"The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        if rng.random() < 0.5:
+            title += f" of {rng.choice(SUBJECTS)}"
+        author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        if rng.random() < LOW_STOCK_SHARE:
+            total = rng.randint(1, backend.LOW_STOCK_THRESHOLD - 1)
+        else:
+            total = rng.randint(backend.LOW_STOCK_THRESHOLD, 50)
+        yield title, author, rng.randint(1800, 2024), isbn13(number), total
+
+
+def generate(path, count, seed=0):
+    """Fill the database at path with count synthetic books and return the number added."""
+    backend.use_database(path)
+    if backend.get_connection().execute("SELECT 1 FROM book LIMIT 1").fetchone():
+        raise backend.BookError(f"{path} already holds books; generate into a new file.")
+
+    batch = []
+    for book in books(count, seed):
+        batch.append(book)
+        if len(batch) == backend.IMPORT_BATCH:
+            backend.insert_many(batch)
+            batch = []
+    backend.insert_many(batch)
+
+    # Trim the change log the load has filled and refresh the planner statistics.
+    backend.connect()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic book catalogue.")
+    parser.add_argument("path", help="database file to create")
+    parser.add_argument("count", type=int, help="number of books, e.g. 10000 to 5000000")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        count = generate(args.path, args.count, args.seed)
+    except backend.BookError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    elapsed = time.perf_counter() - start
+    print(f"Generated {count} books in {args.path} in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} rows/s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Load test of service.py: many counters selling and restocking the same books at once.
+
+    python load_test.py
+    python load_test.py --clients 100 --requests 500 --books 100000
+
+The test starts the service on a throwaway catalogue and lets every client thread mix
+searches and page loads as the frontend makes them with sales of single copies (delete) and restocks (insert of
+an existing book) on a small set of hot books. It then checks that the stock of every
+hot book equals its starting stock plus the restocks minus the sales the service
+confirmed, and exits with status 1 if an update was lost or a request failed.
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import backend
+import generate_catalogue
+import service_client
+from benchmark import percentile
+
+HOT_BOOKS = 20
+
+
+def free_port():
+    """Return a TCP port on localhost that nothing listens on right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(path, port):
+    """Start service.py on the database at path and wait until it answers."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service.py")
+    process = subprocess.Popen([sys.executable, script, "--db", path, "--port", str(port)], stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("The service exited during startup.")
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The service did not start within 30 seconds.")
+
+
+def client(seed, requests, write_share, hot, sample, stats, lock):
+    """Send requests to the service and count the sales and restocks it confirmed."""
+    rng = random.Random(seed)
+    sold = {id: 0 for id in hot}
+    restocked = {id: 0 for id in hot}
+    latencies = {"read": [], "write": []}
+    failures = []
+
+    for _ in range(requests):
+        write = rng.random() < write_share
+        start = time.perf_counter()
+        try:
+            if write:
+                id = rng.choice(list(hot))
+                if rng.random() < 0.75:
+                    service_client.delete(id, 1)
+                    sold[id] += 1
+                else:
+                    title, author, year, isbn, _ = hot[id]
+                    service_client.insert(title, author, str(year), isbn, 2)
+                    restocked[id] += 2
+            else:
+                row = rng.choice(sample)
+                choice = rng.random()
+                if choice < 0.4:
+                    service_client.search(isbn=row[4])
+                elif choice < 0.7:
+                    service_client.view_page(row)
+                else:
+                    service_client.advanced_search_page(author=row[2].split()[1], start_year=str(row[3]))
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+        latencies["write" if write else "read"].append(time.perf_counter() - start)
+
+    service_client.close_connection()
+    with lock:
+        for id in hot:
+            stats["sold"][id] += sold[id]
+            stats["restocked"][id] += restocked[id]
+        for kind in latencies:
+            stats["latencies"][kind] += latencies[kind]
+        stats["failures"] += failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the bookstore service with many concurrent clients.")
+    parser.add_argument("--clients", type=int, default=64, help="concurrent clients (default: 64)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per client (default: 200)")
+    parser.add_argument("--write-share", type=float, default=0.3, help="share of sales and restocks (default: 0.3)")
+    parser.add_argument("--books", type=int, default=10000, help="catalogue size (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="bookstore_load_")
+    path = os.path.join(work_dir, "books.db")
+    port = free_port()
+    service_client.SERVICE_URL = f"http://127.0.0.1:{port}"
+
+    generate_catalogue.generate(path, args.books, args.seed)
+    conn = backend.get_connection()
+    # Stock the hot books so that they cannot sell out, which would turn a restock into a new record.
+    with conn:
+        conn.execute("UPDATE book SET total = ? WHERE id <= ?", (args.clients * args.requests + 1, HOT_BOOKS))
+    hot = {row[0]: row[1:] for row in conn.execute("SELECT * FROM book WHERE id <= ?", (HOT_BOOKS,))}
+    sample = conn.execute("SELECT * FROM book ORDER BY random() LIMIT 1000").fetchall()
+    backend.close_connection()
+
+    process = start_service(path, port)
+    try:
+        stats = {"sold": dict.fromkeys(hot, 0), "restocked": dict.fromkeys(hot, 0),
+                 "latencies": {"read": [], "write": []}, "failures": []}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=client, args=(args.seed + i, args.requests, args.write_share, hot,
+                                                  sample, stats, lock))
+            for i in range(args.clients)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        final = {id: service_client.get_book(id) for id in hot}
+        service_client.close_connection()
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    total = args.clients * args.requests
+    print(f"{args.clients} clients, {total} requests in {elapsed:.2f}s ({total / elapsed:.0f} requests/s)")
+    for kind, values in stats["latencies"].items():
+        values.sort()
+        if values:
+            print(f"{kind:<6}{len(values):>8} requests  p50 {percentile(values, 50) * 1000:.2f} ms"
+                  f"  p95 {percentile(values, 95) * 1000:.2f} ms  p99 {percentile(values, 99) * 1000:.2f} ms")
+
+    lost = 0
+    for id, (title, author, year, isbn, total) in hot.items():
+        expected = total + stats["restocked"][id] - stats["sold"][id]
+        actual = final[id][5]
+        if actual != expected:
+            lost += 1
+            print(f"Book {id}: expected {expected} copies, found {actual}", file=sys.stderr)
+
+    for failure in stats["failures"][:10]:
+        print(failure, file=sys.stderr)
+    print(f"{sum(stats['sold'].values())} sales, {sum(stats['restocked'].values())} copies restocked, "
+          f"{lost} books with lost updates, {len(stats['failures'])} failed requests")
+    return 1 if lost or stats["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
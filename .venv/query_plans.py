@@ -0,0 +1,86 @@
+"""Check that the backend lookups are served by indexes instead of full table scans.
+
+Run with ``python query_plans.py``. Every statement the lookup functions execute is
+captured and passed through EXPLAIN QUERY PLAN on a throwaway database. The script
+exits with status 1 if any of them scans the whole book table, or if a lookup runs no
+query. test_backend.py runs the same checks.
+"""
+import os
+import sys
+import tempfile
+
+import backend
+
+# The last record of a previous page, which the paged lookups resume after.
+ANCHOR = (1, "Dune", "Frank Herbert", 1965, "978-0441013593", 1)
+
+LOOKUPS = [
+    ("search by title", lambda: backend.search(title="Dune")),
+    ("search by author", lambda: backend.search(author="Frank Herbert")),
+    ("search by year", lambda: backend.search(year="1965")),
+    ("search by isbn", lambda: backend.search(isbn="978-0441013593")),
+    ("advanced search by title", lambda: backend.advanced_search(title="dun")),
+    ("advanced search by author and years", lambda: backend.advanced_search(author="herb", start_year="1900", end_year="2000")),
+    ("advanced search by isbn", lambda: backend.advanced_search(isbn="978-044")),
+    ("advanced search by years", lambda: backend.advanced_search(start_year="1900", end_year="2000")),
+    ("insert duplicate checks", lambda: backend.insert("Dune", "Frank Herbert", "1965", "978-0441013593", 1)),
+    ("update isbn check", lambda: backend.update(1, "Dune", "Frank Herbert", "1965", "978-0441013593", 2)),
+    ("low stock", lambda: backend.check_low_stock(5)),
+    ("view page", lambda: backend.view_page(ANCHOR)),
+    ("search page", lambda: backend.search_page(author="Frank Herbert", after=ANCHOR)),
+    ("advanced search page", lambda: backend.advanced_search_page(title="dun", after=ANCHOR + (-1.0,))),
+    ("advanced search page by years", lambda: backend.advanced_search_page(start_year="1900", after=ANCHOR)),
+    ("low stock page", lambda: backend.low_stock_page(5, ANCHOR)),
+]
+
+# Sorted pages of the whole catalogue must also be read in index order, without a sort step.
+SORTED_PAGES = []
+for column in backend.SORT_KEYS:
+    SORTED_PAGES += [
+        (f"view page by {column}", lambda column=column: backend.view_page(ANCHOR, order_by=column)),
+        (f"view page by {column} descending", lambda column=column: backend.view_page(ANCHOR, order_by=column, descending=True)),
+    ]
+
+
+def is_full_scan(detail):
+    """Return True for a plan step that walks the whole book table."""
+    return detail.startswith("SCAN ") and " USING " not in detail and "VIRTUAL TABLE" not in detail
+
+
+def check_plans():
+    """Run every lookup on the current database and yield (status, name, plan) per SELECT it executes."""
+    conn = backend.get_connection()
+    captured = []
+
+    for name, call, sorted_page in [lookup + (False,) for lookup in LOOKUPS] + [page + (True,) for page in SORTED_PAGES]:
+        # Run the query itself rather than answer from a cache entry an earlier lookup left.
+        backend.invalidate_cache()
+        captured.clear()
+        conn.set_trace_callback(captured.append)
+        call()
+        conn.set_trace_callback(None)
+
+        selects = [statement for statement in captured if statement.lstrip().upper().startswith("SELECT")]
+        if not selects:
+            # A lookup that runs no query leaves nothing to check, which must not pass unnoticed.
+            yield "NO QUERY", name, []
+        for statement in selects:
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement)]
+            scans = [detail for detail in plan if is_full_scan(detail)]
+            sorts = sorted_page and any(detail.startswith("USE TEMP B-TREE") for detail in plan)
+            yield "FULL SCAN" if scans else "FULL SORT" if sorts else "ok", name, plan
+
+
+def main():
+    backend.use_database(os.path.join(tempfile.mkdtemp(prefix="bookstore_plans_"), "books.db"))
+    failed = False
+    for status, name, plan in check_plans():
+        failed = failed or status != "ok"
+        print(f"{status:<10}{name}: {' | '.join(plan)}")
+
+    backend.close_connection()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
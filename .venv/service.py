@@ -0,0 +1,212 @@
+"""Local HTTP/JSON service that lets several counters share one book database.
+
+    python service.py
+    python service.py --db /srv/store/books.db --port 8765
+
+Every backend function listed in READS and WRITES is served at POST /<function>, with
+its keyword arguments as a JSON object in an application/json body. The reply is
+{"result": ...}, or {"error": "<exception class>", "message": ...} with a 4xx status for
+backend errors. GET /health answers {"status": "ok"}. Functions that take a file name
+are not served; service_client.py reads and writes those files on the client side.
+
+Reads run concurrently on a pool of threads, each with its own connection. Writes go
+through one writer thread: requests that arrive while it is busy are queued and run as
+the next batch, in one transaction with a savepoint per request, so counters never
+contend for the SQLite write lock and a batch costs a single commit. Imports arrive in
+parts of IMPORT_BATCH rows and each part runs alone with its own commit, so sales are not
+held up behind a whole file.
+Point frontend.py at the service with BOOKSTORE_SERVICE=http://127.0.0.1:8765.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import backend
+
+HOST = "127.0.0.1"
+PORT = 8765
+READ_WORKERS = 8
+WRITE_BATCH = 64
+
+READS = [
+    "get_book", "last_change", "changes_since", "view", "view_page", "search", "search_page",
+    "advanced_search", "advanced_search_page", "check_low_stock", "low_stock_page", "low_stock_ids",
+]
+WRITES = ["insert", "delete", "delete_all", "update", "import_rows"]
+# Writes too large to share a batch; they run alone on the writer thread and commit on their own.
+SOLO_WRITES = ["import_rows"]
+
+ERROR_STATUS = {
+    backend.ValidationError: HTTPStatus.BAD_REQUEST,
+    backend.BookNotFoundError: HTTPStatus.NOT_FOUND,
+    backend.DuplicateIsbnError: HTTPStatus.CONFLICT,
+    backend.InsufficientStockError: HTTPStatus.CONFLICT,
+    backend.LastCopiesError: HTTPStatus.CONFLICT,
+}
+
+read_pool = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix="read")
+write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write")
+write_queue = None
+
+
+def to_json(value):
+    """Encode the sets some backend functions return as sorted lists."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def run_batch(batch):
+    """Run the queued write calls on the writer thread and commit them together.
+
+    Each call has its own savepoint, so a rejected request cannot undo the others.
+    """
+    outcomes = []
+    with backend.write_batch():
+        for name, arguments, _ in batch:
+            try:
+                outcomes.append((None, getattr(backend, name)(**arguments)))
+            except Exception as e:
+                outcomes.append((e, None))
+    return outcomes
+
+
+async def run_writer():
+    """Hand the queued writes to the writer thread, as many as are waiting at a time."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await write_queue.get()]
+        while len(batch) < WRITE_BATCH and not write_queue.empty():
+            batch.append(write_queue.get_nowait())
+
+        try:
+            outcomes = await loop.run_in_executor(write_pool, run_batch, batch)
+        except Exception as e:
+            # The commit failed, so none of the writes took effect.
+            outcomes = [(e, None)] * len(batch)
+        for (_, _, future), (error, result) in zip(batch, outcomes):
+            if future.cancelled():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+async def call(name, arguments):
+    """Run the backend function name with arguments, queued for the writer if it changes data."""
+    loop = asyncio.get_running_loop()
+    if name in SOLO_WRITES:
+        return await loop.run_in_executor(write_pool, lambda: getattr(backend, name)(**arguments))
+    if name in WRITES:
+        future = loop.create_future()
+        await write_queue.put((name, arguments, future))
+        return await future
+    return await loop.run_in_executor(read_pool, lambda: getattr(backend, name)(**arguments))
+
+
+async def dispatch(method, path, content_type, body):
+    """Return the status and JSON reply for one request."""
+    name = path.strip("/")
+    if method == "GET" and name == "health":
+        return HTTPStatus.OK, {"status": "ok"}
+    if name not in READS and name not in WRITES:
+        return HTTPStatus.NOT_FOUND, {"error": "NotFound", "message": f"Unknown function {name!r}."}
+    if method != "POST":
+        return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "MethodNotAllowed", "message": "Use POST."}
+    if content_type.split(";")[0].strip().lower() != "application/json":
+        # Browsers send simple text/plain posts cross-origin without asking; JSON ones they preflight.
+        return HTTPStatus.UNSUPPORTED_MEDIA_TYPE, {"error": "UnsupportedMediaType", "message": "Send application/json."}
+
+    try:
+        arguments = json.loads(body or b"{}")
+        if not isinstance(arguments, dict):
+            raise ValueError("the body must be a JSON object")
+    except ValueError as e:
+        return HTTPStatus.BAD_REQUEST, {"error": "BadRequest", "message": f"Invalid JSON body: {e}"}
+
+    try:
+        inspect.signature(getattr(backend, name)).bind(**arguments)
+    except TypeError as e:
+        return HTTPStatus.BAD_REQUEST, {"error": "BadRequest", "message": str(e)}
+
+    try:
+        return HTTPStatus.OK, {"result": await call(name, arguments)}
+    except backend.BookError as e:
+        return ERROR_STATUS.get(type(e), HTTPStatus.BAD_REQUEST), {"error": type(e).__name__, "message": str(e)}
+    except Exception as e:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": type(e).__name__, "message": str(e)}
+
+
+async def handle_client(reader, writer):
+    """Serve the HTTP/1.1 requests of one client connection until it closes."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, version = request_line.decode("latin-1").split()
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                header, _, value = line.decode("latin-1").partition(":")
+                headers[header.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            status, reply = await dispatch(method, path, headers.get("content-type", ""), body)
+            data = json.dumps(reply, default=to_json).encode()
+            writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                         f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+            await writer.drain()
+
+            if version == "HTTP/1.0" or headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        # A malformed request or a client that went away; drop the connection.
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=HOST, port=PORT):
+    """Serve requests on host:port until cancelled."""
+    global write_queue
+    write_queue = asyncio.Queue()
+    # Create and migrate the database before the first request arrives.
+    await asyncio.get_running_loop().run_in_executor(write_pool, backend.get_connection)
+
+    server = await asyncio.start_server(handle_client, host, port)
+    writer_task = asyncio.create_task(run_writer())
+    print(f"Serving {backend.DB_NAME} on http://{host}:{port}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        writer_task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the book database to several frontends over HTTP.")
+    parser.add_argument("--host", default=HOST, help=f"address to listen on (default: {HOST})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"port to listen on (default: {PORT})")
+    parser.add_argument("--db", help=f"database file to serve instead of {backend.DB_NAME}")
+    args = parser.parse_args(argv)
+    if args.db:
+        backend.use_database(args.db)
+
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Client of service.py with the same functions and exceptions as the backend module.
+
+    import service_client as backend
+    backend.delete(42, 1)
+
+The service address comes from the BOOKSTORE_SERVICE environment variable, by default
+http://127.0.0.1:8765. Every thread keeps its own connection to the service open.
+CSV files are read and written here, and only their rows travel to or from the service.
+"""
+import csv
+import http.client
+import inspect
+import itertools
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import backend
+import service
+from backend import (PAGE_SIZE, LOW_STOCK_THRESHOLD, SORT_KEYS, BookError, ValidationError, DuplicateIsbnError,
+                     BookNotFoundError, InsufficientStockError, LastCopiesError)
+
+SERVICE_URL = os.environ.get("BOOKSTORE_SERVICE") or f"http://{service.HOST}:{service.PORT}"
+TIMEOUT = 30
+
+# Results JSON cannot carry as they are.
+RESULT_TYPES = {"low_stock_ids": frozenset}
+
+_local = threading.local()
+
+
+def get_connection():
+    """Return the connection of the current thread to the service, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        address = urlsplit(SERVICE_URL)
+        conn = http.client.HTTPConnection(address.hostname, address.port or 80, timeout=TIMEOUT)
+        _local.conn = conn
+    return conn
+
+
+def close_connection():
+    """Close the connection of the current thread, if it has one."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def call(name, **arguments):
+    """Call the backend function name on the service and return its result.
+
+    Backend errors are raised again as the same BookError subclass.
+    """
+    conn = get_connection()
+    try:
+        conn.request("POST", f"/{name}", json.dumps(arguments), {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        reply = json.loads(response.read())
+    except Exception:
+        # Do not reuse a connection that is in an unknown state.
+        close_connection()
+        raise
+
+    if "error" in reply:
+        error = getattr(backend, reply["error"], None)
+        if not (isinstance(error, type) and issubclass(error, BookError)):
+            error = BookError
+        raise error(reply["message"])
+    return RESULT_TYPES.get(name, lambda result: result)(reply["result"])
+
+
+def _remote(name):
+    """Return a function that calls the backend function name on the service."""
+    function = getattr(backend, name)
+    signature = inspect.signature(function)
+
+    def remote(*args, **kwargs):
+        return call(name, **signature.bind(*args, **kwargs).arguments)
+
+    remote.__name__ = name
+    remote.__doc__ = function.__doc__
+    return remote
+
+
+for _name in service.READS + service.WRITES:
+    globals()[_name] = _remote(_name)
+
+
+def data_version():
+    """Return a number that changes whenever the catalogue does: the position of the service's change log."""
+    return last_change()
+
+
+def export_csv(filename="books_backup.csv"):
+    """Write every book record of the service to a local CSV file, gzip-compressed if its name ends in .gz.
+
+    Returns the count.
+    """
+    count = 0
+    after = None
+    with backend.open_csv(filename, "w") as file:
+        writer = csv.writer(file)
+        writer.writerow(backend.CSV_HEADER)
+        while True:
+            rows = view_page(after, limit=backend.EXPORT_BATCH)
+            writer.writerows(rows)
+            count += len(rows)
+            if len(rows) < backend.EXPORT_BATCH:
+                return count
+            after = rows[-1]
+
+
+def backup_to_csv(filename="books_backup.csv"):
+    """Backup the database to a local CSV file and return its name."""
+    export_csv(filename)
+    return filename
+
+
+def import_csv(filename):
+    """Bulk import the book records of a local CSV file through the service; see backend.import_csv().
+
+    The rows are sent IMPORT_BATCH at a time and every part is committed on its own, so sales
+    from other counters go through between the parts.
+    """
+    added = merged = 0
+    errors = []
+    with backend.open_csv(filename, "r") as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        while True:
+            rows = [(reader.line_num, row) for row in itertools.islice(reader, backend.IMPORT_BATCH)]
+            counts = import_rows(header, rows)
+            added, merged = added + counts[0], merged + counts[1]
+            errors += [tuple(error) for error in counts[2]]
+            if len(rows) < backend.IMPORT_BATCH:
+                return added, merged, errors
@@ -0,0 +1,231 @@
+"""Tests of the backend on throwaway databases. Run with ``python -m pytest``."""
+import asyncio
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import backend
+import generate_catalogue
+import query_plans
+import service
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "books.db")
+    backend.use_database(path)
+    yield path
+    backend.close_connection()
+
+
+@pytest.fixture
+def catalogue(db):
+    backend.insert_many(generate_catalogue.books(1000))
+    return db
+
+
+def drain(page, limit=37, **arguments):
+    """Return every record of a paged listing, page by page."""
+    rows = []
+    after = None
+    while True:
+        found = page(after=after, limit=limit, **arguments)
+        rows += found
+        if len(found) < limit:
+            return rows
+        after = found[-1]
+
+
+def test_lookups_use_indexes(db):
+    problems = [(status, name, plan) for status, name, plan in query_plans.check_plans() if status != "ok"]
+    assert problems == []
+
+
+def test_pages_cover_the_listing(catalogue):
+    expected = backend.get_connection().execute("SELECT * FROM book ORDER BY id").fetchall()
+    assert drain(backend.view_page) == expected
+    author = expected[0][2]
+    assert drain(backend.search_page, author=author) == sorted(backend.search(author=author))
+    assert drain(backend.low_stock_page, threshold=5) == sorted(backend.check_low_stock(5))
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("order_by", list(backend.SORT_KEYS))
+def test_pages_cover_the_sorted_listing(catalogue, order_by, descending):
+    direction = " DESC" if descending else ""
+    order = ", ".join(column + direction for column in backend.SORT_KEYS[order_by])
+    expected = backend.get_connection().execute("SELECT * FROM book ORDER BY " + order).fetchall()
+    assert drain(backend.view_page, order_by=order_by, descending=descending) == expected
+
+
+def test_ranked_pages_cover_the_advanced_search(catalogue):
+    rows = drain(backend.advanced_search_page, title="silent")
+    assert rows
+    assert sorted(row[:len(backend.COLUMNS)] for row in rows) == sorted(backend.advanced_search(title="silent"))
+
+
+@pytest.mark.parametrize("order_by", ["id", "title"])
+def test_page_resumes_after_a_deleted_anchor(catalogue, order_by):
+    first = backend.view_page(limit=50, order_by=order_by)
+    expected = backend.view_page(first[-1], limit=50, order_by=order_by)
+    backend.delete_all(first[-1][0])
+    assert backend.view_page(first[-1], limit=50, order_by=order_by) == expected
+
+
+def test_ranked_page_resumes_after_a_deleted_anchor(catalogue):
+    first = backend.advanced_search_page(title="silent", limit=10)
+    backend.delete_all(first[-1][0])
+    # Deleting a book shifts the ranks of the others a little, so only check that the page continues.
+    rows = backend.advanced_search_page(title="silent", after=first[-1], limit=10)
+    assert len(rows) == 10
+    assert not {row[0] for row in rows} & {row[0] for row in first}
+
+
+def write_csv(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_import_merges_and_rejects(db, tmp_path):
+    backend.insert("Dune", "Frank Herbert", "1965", "978-0441013593", 2)
+    filename = write_csv(tmp_path / "feed.csv", "\n".join([
+        "ID,Title,Author,Year,ISBN,Total",
+        ",Dune,Frank Herbert,1965,978-0441013593,3",
+        ",Emma,Jane Austen,1815,978-0141439587,1",
+        ",Emma,Jane Austen,1815,978-0141439587,4",
+        ",Other,Someone,2000,978-0441013593,1",
+        ",No Year,Someone,,978-1,1",
+        ",Short,Row",
+        "",
+    ]) + "\n\n")
+
+    added, merged, errors = backend.import_csv(filename)
+
+    assert (added, merged) == (1, 1)
+    assert [line for line, _ in errors] == [5, 6, 7]
+    assert backend.search(isbn="978-0441013593")[0][5] == 5
+    assert backend.search(isbn="978-0141439587")[0][5] == 5
+
+
+def test_import_requires_the_header_columns(db, tmp_path):
+    with pytest.raises(backend.ValidationError):
+        backend.import_csv(write_csv(tmp_path / "feed.csv", "Title,Author\nDune,Frank Herbert\n"))
+
+
+def test_export_round_trip(catalogue, tmp_path):
+    filename = str(tmp_path / "books.csv.gz")
+    assert backend.export_csv(filename) == 1000
+    assert backend.import_csv(filename) == (0, 1000, [])
+
+
+def test_delete_decrements_and_confirms_removal(db):
+    id, _ = backend.insert("Dune", "Frank Herbert", "1965", "978-0441013593", 3)
+
+    assert backend.delete(id, 1)[1][5] == 2
+    with pytest.raises(backend.LastCopiesError):
+        backend.delete(id, 2)
+    with pytest.raises(backend.InsufficientStockError):
+        backend.delete(id, 3)
+    assert backend.delete(id, 2, remove_last=True) == (id, None)
+    with pytest.raises(backend.BookNotFoundError):
+        backend.delete(id, 1)
+
+
+@pytest.mark.parametrize("total", [0, -50, "1", True])
+def test_delete_rejects_invalid_totals(db, total):
+    id, _ = backend.insert("Dune", "Frank Herbert", "1965", "978-0441013593", 3)
+    with pytest.raises(backend.ValidationError):
+        backend.delete(id, total)
+    assert backend.get_book(id)[5] == 3
+
+
+def test_concurrent_sales_lose_no_updates(db):
+    id, _ = backend.insert("Dune", "Frank Herbert", "1965", "978-0441013593", 1000)
+
+    def sell():
+        for _ in range(100):
+            backend.delete(id, 1)
+        backend.close_connection()
+
+    threads = [threading.Thread(target=sell) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.get_book(id)[5] == 200
+
+
+def test_update_of_a_missing_book_fails(db):
+    with pytest.raises(backend.BookNotFoundError):
+        backend.update(42, "Dune", "Frank Herbert", "1965", "978-0441013593", 1)
+
+
+def test_cache_sees_writes_from_other_connections(db):
+    id, _ = backend.insert("Dune", "Frank Herbert", "1965", "978-0441013593", 3)
+    assert backend.search(author="Frank Herbert")[0][5] == 3
+
+    backend.delete(id, 1)
+    assert backend.search(author="Frank Herbert")[0][5] == 2
+
+    other = sqlite3.connect(db)
+    with other:
+        other.execute("UPDATE book SET total = 7 WHERE id=?", (id,))
+    other.close()
+    assert backend.search(author="Frank Herbert")[0][5] == 7
+
+
+def test_low_stock_ids_follow_changes(db):
+    id, _ = backend.insert("Dune", "Frank Herbert", "1965", "978-0441013593", 6)
+    assert id not in backend.low_stock_ids()
+    backend.delete(id, 2)
+    assert id in backend.low_stock_ids()
+
+
+def test_change_log_stays_bounded(db):
+    backend.insert_many(generate_catalogue.books(backend.CHANGE_LOG_SIZE + 3 * backend.CHANGE_LOG_TRIM))
+    count = backend.get_connection().execute("SELECT COUNT(*) FROM book_change").fetchone()[0]
+    assert count < backend.CHANGE_LOG_SIZE + backend.CHANGE_LOG_TRIM
+
+    last, changes = backend.changes_since(0)
+    assert changes is None
+
+
+def test_write_batch_keeps_the_writes_that_succeed(db):
+    id, _ = backend.insert("Dune", "Frank Herbert", "1965", "978-0441013593", 3)
+    batch = [
+        ("delete", {"id": id, "total": 1}, None),
+        ("delete", {"id": id, "total": 99}, None),
+        ("insert", {"title": "Emma", "author": "Jane Austen", "year": "1815", "isbn": "978-0141439587", "total": 1}, None),
+    ]
+
+    outcomes = service.run_batch(batch)
+
+    assert [type(error) for error, _ in outcomes] == [type(None), backend.InsufficientStockError, type(None)]
+    assert backend.get_book(id)[5] == 2
+    assert len(backend.view()) == 2
+
+
+@pytest.mark.parametrize("path, content_type, status", [
+    ("/export_csv", "application/json", 404),
+    ("/import_csv", "application/json", 404),
+    ("/view_page", "text/plain", 415),
+    ("/view_page", "application/json; charset=utf-8", 200),
+])
+def test_service_refuses_files_and_simple_posts(db, path, content_type, status):
+    reply_status, _ = asyncio.run(service.dispatch("POST", path, content_type, b"{}"))
+    assert reply_status == status
+
+
+def test_service_commits_each_import_part_on_its_own(db):
+    rows = [[7, ["", "Dune", "Frank Herbert", "1965", "978-0441013593", "2"]], [9, ["", "Emma", "Jane Austen", "", "978-1", "1"]]]
+    body = json.dumps({"header": backend.CSV_HEADER, "rows": rows}).encode()
+
+    status, reply = asyncio.run(service.dispatch("POST", "/import_rows", "application/json", body))
+
+    assert status == 200
+    added, merged, errors = reply["result"]
+    assert (added, merged, [line for line, _ in errors]) == (1, 0, [9])
+    assert backend.search(isbn="978-0441013593")[0][5] == 2